@@ -0,0 +1,393 @@
+# coding: utf-8
+"""
+Created on 15 Oct 2026
+
+Numba-compiled kernels of the LQMC hot loops. If Numba is not installed the
+kernels fall back to plain Python functions (slow, but functional).
+
+project: LatticeQMC
+version: 1.0
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        # Mimic the decorator signature of 'numba.njit' with and without arguments
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+@njit(fastmath=True, cache=True)
+def _exp_v_nb(config, l, sigma, exp_pm):
+    r""" Returns the diagonal of the matrix exponential of 'V_\sigma(l)' using the table 'exp_pm'. """
+    return exp_pm[(1 - sigma * config[:, l]) // 2]
+
+
+@njit(fastmath=True, cache=True)
+def _udt_qr_nb(u, d, t):
+    r""" Restores the 'U D T'-decomposition with a pre-pivoted QR, see 'LatticeQMC._udt_qr'. """
+    ud = u * d
+    p = np.argsort(-np.sqrt(np.sum(ud * ud, axis=0)))
+    q, r = np.linalg.qr(ud[:, p])
+    d = np.abs(np.diag(r))
+    t = np.dot(r / d.reshape((-1, 1)), np.ascontiguousarray(t[p]))
+    return np.ascontiguousarray(q), d, t
+
+
+@njit(fastmath=True, cache=True)
+def _gf_udt_nb(u_l, d_l, t_l, u_r, d_r, t_r):
+    r""" Computes the GF from the stabilized B-products left and right of the cut, see 'LatticeQMC._gf_udt'. """
+    dl_big = np.maximum(d_l, 1.).reshape((-1, 1))
+    dl_small = np.minimum(d_l, 1.).reshape((-1, 1))
+    dr_big = np.maximum(d_r, 1.)
+    dr_small = np.minimum(d_r, 1.)
+    u_lt = np.ascontiguousarray(u_l.T)
+    mat = np.dot(u_lt, u_r) / dl_big / dr_big + dl_small * np.dot(t_l, np.ascontiguousarray(t_r.T)) * dr_small
+    return np.dot(u_r / dr_big, np.linalg.solve(mat, u_lt / dl_big))
+
+
+@njit(fastmath=True, cache=True)
+def _b_stack_nb(config, exp_k, exp_pm, sigma, stab_steps):
+    r""" Computes the stabilized partial B-products of the sweep, see 'LatticeQMC._b_stack'.
+
+    Returns
+    -------
+    u, d, t: np.ndarray
+        Arrays of shape (J, N, N), (J, N) and (J, N, N) with the 'U D T'-decompositions of
+        the products of the first 'j' blocks of time slices.
+    """
+    n_sites, time_steps = config.shape
+    n_blocks = (time_steps + stab_steps - 1) // stab_steps
+    stack_u = np.empty((n_blocks, n_sites, n_sites))
+    stack_d = np.empty((n_blocks, n_sites))
+    stack_t = np.empty((n_blocks, n_sites, n_sites))
+    u = np.eye(n_sites)
+    d = np.ones(n_sites)
+    t = np.eye(n_sites)
+    stack_u[0], stack_d[0], stack_t[0] = u, d, t
+    for j in range(1, n_blocks):
+        for l in range((j - 1) * stab_steps, j * stab_steps):
+            u = np.dot(exp_k * _exp_v_nb(config, l, sigma, exp_pm), u)
+        u, d, t = _udt_qr_nb(u, d, t)
+        stack_u[j], stack_d[j], stack_t[j] = u, d, t
+    return stack_u, stack_d, stack_t
+
+
+@njit(fastmath=True, cache=True)
+def _gf_nb(config, exp_k, exp_pm, l0, sigma, stab_steps):
+    r""" Computes the Green's function for spin '\sigma' in the cyclic permutation starting at 'l0'.
+
+    Same as 'LatticeQMC.get_gf': The B-product is accumulated as a stabilized 'UDT'
+    decomposition, with a pre-pivoted QR-decomposition every 'stab_steps' multiplications.
+    """
+    n_sites, time_steps = config.shape
+    l0 = l0 % time_steps
+    u = np.eye(n_sites)
+    d = np.ones(n_sites)
+    t = np.eye(n_sites)
+    tmp = np.empty((n_sites, n_sites))
+    # Time slices in cyclic permutation: l0-1, ..., 0, L-1, L-2, ..., l0,
+    # multiplied from the right
+    for k in range(time_steps):
+        l = (l0 + k) % time_steps
+        b = exp_k * _exp_v_nb(config, l, sigma, exp_pm)
+        np.dot(b, u, tmp)
+        u, tmp = tmp, u
+        if (k + 1) % stab_steps == 0 or k + 1 == time_steps:
+            u, d, t = _udt_qr_nb(u, d, t)
+            tmp = np.empty((n_sites, n_sites))
+    # Assemble G=(I+UDT)^{-1}
+    d_big = np.maximum(d, 1.)
+    d_small = np.minimum(d, 1.)
+    u_t = np.ascontiguousarray(u.T) / d_big.reshape((-1, 1))
+    return np.ascontiguousarray(np.linalg.solve(u_t + d_small.reshape((-1, 1)) * t, u_t))
+
+
+@njit(fastmath=True, cache=True)
+def _rank1_update_nb(gf, i, alpha, col, row):
+    r""" Performs the update 'G += \alpha (G[:, i] - e_i) G[i, :]' in place.
+
+    The arrays 'col' and 'row' are scratch buffers of length N.
+    """
+    n_sites = gf.shape[0]
+    for j in range(n_sites):
+        col[j] = gf[j, i]
+        row[j] = gf[i, j]
+    col[i] -= 1
+    for j in range(n_sites):
+        c = alpha * col[j]
+        for k in range(n_sites):
+            gf[j, k] += c * row[k]
+
+
+@njit(fastmath=True, cache=True)
+def _metropolis_step_nb(gf_up, gf_dn, config, i, l, delta_pm, rand, col, row):
+    r""" Proposes a spin-flip of the HS-field at site 'i' and time slice 'l'.
+
+    If the move is accepted the configuration and the Green's functions of both spins
+    are updated in place.
+
+    Parameters
+    ----------
+    gf_up: (N, N) np.ndarray
+        Green's function .math'G_{\uparrow}' of the time slice 'l'.
+    gf_dn: (N, N) np.ndarray
+        Green's function .math'G_{\downarrow}' of the time slice 'l'.
+    config: (N, L) np.ndarray
+        Array of the HS-field.
+    i: int
+        Site index.
+    l: int
+        Time-slice index.
+    delta_pm: (2) np.ndarray
+        Lookup table of .math'e^{-2\lambda} - 1' and .math'e^{+2\lambda} - 1' of the acceptance ratio.
+    rand: float
+        Uniform random number for the acceptance of the move.
+    col: (N) np.ndarray
+        Scratch buffer.
+    row: (N) np.ndarray
+        Scratch buffer.
+
+    Returns
+    -------
+    accepted: bool
+    """
+    # Compute acceptance ratio
+    idx = (config[i, l] + 1) // 2
+    d_up = delta_pm[idx]
+    d_dn = delta_pm[1 - idx]
+    r_up = 1 + (1 - gf_up[i, i]) * d_up
+    r_dn = 1 + (1 - gf_dn[i, i]) * d_dn
+    if rand > r_up * r_dn:
+        return False
+    # Update Greens function in place (Sherman-Morrison):
+    # G' = G + d/r (G[:, i] - e_i) G[i, :]
+    _rank1_update_nb(gf_up, i, d_up / r_up, col, row)
+    _rank1_update_nb(gf_dn, i, d_dn / r_dn, col, row)
+    # Update HS-field
+    config[i, l] = -config[i, l]
+    return True
+
+
+@njit(fastmath=True, cache=True)
+def _delayed_update_nb(gf, x, y, k, i, alpha):
+    r""" Stores the update 'G += \alpha (G[:, i] - e_i) G[i, :]' as the 'k'-th delayed rank-1 update.
+
+    The delayed updates are kept in the rows of 'x' and 'y', so that the current
+    Green's function is given by 'G + x[:k]^T y[:k]'. Only the column and row 'i' of the
+    current GF are assembled here, the 'k' updates are applied at once in '_flush_nb'.
+    """
+    n_sites = gf.shape[0]
+    for j in range(n_sites):
+        x[k, j] = gf[j, i]
+        y[k, j] = gf[i, j]
+    for m in range(k):
+        x_mi = x[m, i]
+        y_mi = y[m, i]
+        for j in range(n_sites):
+            x[k, j] += x[m, j] * y_mi
+            y[k, j] += y[m, j] * x_mi
+    x[k, i] -= 1
+    for j in range(n_sites):
+        x[k, j] *= alpha
+
+
+@njit(fastmath=True, cache=True)
+def _flush_nb(gf, x, y, k, tmp):
+    r""" Applies the 'k' delayed updates to the GF in place: 'G += x[:k]^T y[:k]'. """
+    if k > 0:
+        np.dot(x[:k].T, y[:k], tmp)
+        gf += tmp
+
+
+@njit(fastmath=True, cache=True)
+def _delayed_metropolis_step_nb(gf_up, gf_dn, config, i, l, delta_pm, rand, x_up, y_up, x_dn, y_dn, k):
+    r""" Same as '_metropolis_step_nb', but delays the update of the Green's functions.
+
+    The first 'k' rows of the buffers 'x' and 'y' hold the pending updates of each spin.
+    An accepted move is appended as the 'k'-th update.
+
+    Returns
+    -------
+    accepted: bool
+    """
+    # Diagonal element of the current GF including the pending updates
+    gii_up = gf_up[i, i]
+    gii_dn = gf_dn[i, i]
+    for m in range(k):
+        gii_up += x_up[m, i] * y_up[m, i]
+        gii_dn += x_dn[m, i] * y_dn[m, i]
+    # Compute acceptance ratio
+    idx = (config[i, l] + 1) // 2
+    d_up = delta_pm[idx]
+    d_dn = delta_pm[1 - idx]
+    r_up = 1 + (1 - gii_up) * d_up
+    r_dn = 1 + (1 - gii_dn) * d_dn
+    if rand > r_up * r_dn:
+        return False
+    _delayed_update_nb(gf_up, x_up, y_up, k, i, d_up / r_up)
+    _delayed_update_nb(gf_dn, x_dn, y_dn, k, i, d_dn / r_dn)
+    # Update HS-field
+    config[i, l] = -config[i, l]
+    return True
+
+
+@njit(fastmath=True, cache=True)
+def _wrap_nb(gf, exp_k, exp_k_inv, exp_v, tmp):
+    r""" Wraps the GF in place to the previous time slice: 'G = exp_v^{-1} exp_k^{-1} G exp_k exp_v'. """
+    n_sites = gf.shape[0]
+    np.dot(exp_k_inv, gf, tmp)
+    np.dot(tmp, exp_k, gf)
+    for j in range(n_sites):
+        for k in range(n_sites):
+            gf[j, k] *= exp_v[k] / exp_v[j]
+
+
+@njit(fastmath=True, cache=True)
+def _slice_buffers_nb(n_sites, delay_steps):
+    r""" Allocates the scratch buffers of '_update_slice_nb'.
+
+    Returns
+    -------
+    buffers: tuple of np.ndarray
+        The buffers 'col', 'row', 'x_up', 'y_up', 'x_dn', 'y_dn' and 'tmp'.
+    """
+    n_delay = max(1, min(delay_steps, n_sites))
+    col = np.empty(n_sites)
+    row = np.empty(n_sites)
+    x_up = np.empty((n_delay, n_sites))
+    y_up = np.empty((n_delay, n_sites))
+    x_dn = np.empty((n_delay, n_sites))
+    y_dn = np.empty((n_delay, n_sites))
+    tmp = np.empty((n_sites, n_sites))
+    return col, row, x_up, y_up, x_dn, y_dn, tmp
+
+
+@njit(fastmath=True, cache=True)
+def _update_slice_nb(gf_up, gf_dn, config, l, delta_pm, rands, col, row, x_up, y_up, x_dn, y_dn, tmp):
+    r""" Runs the Metropolis steps of all sites of the time slice 'l'.
+
+    The Green's functions are updated in place. If the buffers 'x' and 'y' have more than one
+    row, the updates are delayed and applied as rank-k updates, otherwise the GF is updated
+    after every accepted move. All updates are applied when the function returns.
+
+    Parameters
+    ----------
+    gf_up: (N, N) np.ndarray
+        Green's function .math'G_{\uparrow}' of the time slice 'l'.
+    gf_dn: (N, N) np.ndarray
+        Green's function .math'G_{\downarrow}' of the time slice 'l'.
+    config: (N, L) np.ndarray
+        Array of the HS-field. The array is updated in place.
+    l: int
+        Time-slice index.
+    delta_pm: (2) np.ndarray
+        Lookup table of .math'e^{-2\lambda} - 1' and .math'e^{+2\lambda} - 1' of the acceptance ratio.
+    rands: (N) np.ndarray
+        Uniform random numbers used for the acceptance of each step.
+    col, row, x_up, y_up, x_dn, y_dn, tmp: np.ndarray
+        Scratch buffers, see '_slice_buffers_nb'.
+    """
+    n_sites = config.shape[0]
+    n_delay = x_up.shape[0]
+    if n_delay < 2:
+        for i in range(n_sites):
+            _metropolis_step_nb(gf_up, gf_dn, config, i, l, delta_pm, rands[i], col, row)
+    else:
+        k = 0
+        for i in range(n_sites):
+            if _delayed_metropolis_step_nb(gf_up, gf_dn, config, i, l, delta_pm, rands[i],
+                                           x_up, y_up, x_dn, y_dn, k):
+                k += 1
+            if k == n_delay:
+                _flush_nb(gf_up, x_up, y_up, k, tmp)
+                _flush_nb(gf_dn, x_dn, y_dn, k, tmp)
+                k = 0
+        # Apply the remaining updates
+        _flush_nb(gf_up, x_up, y_up, k, tmp)
+        _flush_nb(gf_dn, x_dn, y_dn, k, tmp)
+
+
+@njit(fastmath=True, cache=True)
+def _update_step_nb(config, exp_k, exp_k_inv, exp_pm, delta_pm, rands, stab_steps=8, delay_steps=0,
+                    gf_total=None):
+    r""" Runs one sweep over all time-slices and sites of the configuration.
+
+    Parameters
+    ----------
+    config: (N, L) np.ndarray
+        Array of the HS-field. The array is updated in place.
+    exp_k: (N, N) np.ndarray
+        Matrix exponential of the kinetic hamiltonian.
+    exp_k_inv: (N, N) np.ndarray
+        Inverse of 'exp_k'.
+    exp_pm: (2) np.ndarray
+        Lookup table of .math'e^{-\lambda}' and .math'e^{+\lambda}' for the HS-coupling .math'\lambda'.
+    delta_pm: (2) np.ndarray
+        Lookup table of .math'e^{-2\lambda} - 1' and .math'e^{+2\lambda} - 1' of the acceptance ratio.
+    rands: (L, N) np.ndarray
+        Uniform random numbers used for the acceptance of each step.
+    stab_steps: int, optional
+        Number of B-matrix multiplications between two QR-decompositions and number of
+        time slices between two recomputations of the Green's functions.
+    delay_steps: int, optional
+        Maximal number of accepted moves whose updates are delayed and applied at once
+        as a rank-k update. For values smaller than 2 the GF is updated after every move.
+    gf_total: (2, N, N) np.ndarray, optional
+        Accumulator of measurements. If given, the Green's functions of every time slice
+        are added to it in place.
+
+    Returns
+    -------
+    gf_up: (N, N) np.ndarray
+        Green's function .math'G_{\uparrow}' after the sweep.
+    gf_dn: (N, N) np.ndarray
+        Green's function .math'G_{\downarrow}' after the sweep.
+    """
+    n_sites, time_steps = config.shape
+    # Initialize greens functions of the last time slice ('B_{L-1}' is the last factor)
+    gf_up = _gf_nb(config, exp_k, exp_pm, time_steps - 1, +1, stab_steps)
+    gf_dn = _gf_nb(config, exp_k, exp_pm, time_steps - 1, -1, stab_steps)
+    # Stabilized B-products of the time slices below the current slice and
+    # transposed B-products of the (updated) time slices above
+    stack_u_up, stack_d_up, stack_t_up = _b_stack_nb(config, exp_k, exp_pm, +1, stab_steps)
+    stack_u_dn, stack_d_dn, stack_t_dn = _b_stack_nb(config, exp_k, exp_pm, -1, stab_steps)
+    ur_up, dr_up, tr_up = np.eye(n_sites), np.ones(n_sites), np.eye(n_sites)
+    ur_dn, dr_dn, tr_dn = np.eye(n_sites), np.ones(n_sites), np.eye(n_sites)
+    exp_k_t = np.ascontiguousarray(exp_k.T)
+    # Scratch buffers of the update steps
+    col, row, x_up, y_up, x_dn, y_dn, tmp = _slice_buffers_nb(n_sites, delay_steps)
+    # Iterate over all time-steps, starting at the end (.math:'\beta')
+    for l in range(time_steps - 1, -1, -1):
+        # Iterate over all lattice sites
+        _update_slice_nb(gf_up, gf_dn, config, l, delta_pm, rands[l], col, row, x_up, y_up, x_dn, y_dn, tmp)
+
+        # Add the updated time slice to the transposed product of the slices above
+        ur_up = np.dot(_exp_v_nb(config, l, +1, exp_pm).reshape((-1, 1)) * exp_k_t, ur_up)
+        ur_dn = np.dot(_exp_v_nb(config, l, -1, exp_pm).reshape((-1, 1)) * exp_k_t, ur_dn)
+        # The rounding errors of the wrapping grow exponentially with the number of wraps,
+        # so the GF is recomputed from the stabilized B-products every 'stab_steps' slices
+        if l % stab_steps == 0:
+            j = l // stab_steps
+            ur_up, dr_up, tr_up = _udt_qr_nb(ur_up, dr_up, tr_up)
+            ur_dn, dr_dn, tr_dn = _udt_qr_nb(ur_dn, dr_dn, tr_dn)
+            gf_up = _gf_udt_nb(stack_u_up[j], stack_d_up[j], stack_t_up[j], ur_up, dr_up, tr_up)
+            gf_dn = _gf_udt_nb(stack_u_dn[j], stack_d_dn[j], stack_t_dn[j], ur_dn, dr_dn, tr_dn)
+
+        # Accumulate the equal-time GF of the time slice in place for measurements
+        if gf_total is not None:
+            gf_total[0] += gf_up
+            gf_total[1] += gf_dn
+
+        # Update the GF for the next time slice (Wrapping): G_{l-1} = B_{l-1}^{-1} G_l B_{l-1}
+        if l > 0:
+            _wrap_nb(gf_up, exp_k, exp_k_inv, _exp_v_nb(config, l - 1, +1, exp_pm), tmp)
+            _wrap_nb(gf_dn, exp_k, exp_k_inv, _exp_v_nb(config, l - 1, -1, exp_pm), tmp)
+
+    return gf_up, gf_dn
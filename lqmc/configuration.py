@@ -84,11 +84,15 @@ class ConfigPlot(Plot):
 
 
 class Configuration:
-    """ Configuration class representing the Hubbard-Stratonovich (HS) field."""
+    """ Configuration class representing the Hubbard-Stratonovich (HS) field.
+
+    The field is stored in column-major (Fortran) order, such that the sites of one
+    time slice 'config[:, l]' are contiguous in memory.
+    """
 
     dtype = np.int8
 
-    def __init__(self, n_sites, time_steps, array=None):
+    def __init__(self, n_sites, time_steps, array=None, rng=None):
         """ Constructor of the Configuration class
 
         Parameters
@@ -99,9 +103,12 @@ class Configuration:
             Number of time slices (per site).
         array: np.ndarray of np.int8, optional
             Existing configuration to use.
+        rng: np.random.Generator or int, optional
+            Random number generator or seed used for initializing the configuration.
         """
         self.n_sites = n_sites
         self.time_steps = time_steps
+        self.rng = np.random.default_rng(rng)
         self.config = np.ndarray
         if array is not None:
             self.config = array
@@ -115,13 +122,14 @@ class Configuration:
         -------
         config: Configuration
         """
-        return Configuration(self.n_sites, self.time_steps, array=self.config.copy())
+        return Configuration(self.n_sites, self.time_steps, array=self.config.copy(order="K"),
+                             rng=self.rng)
 
     def initialize(self):
         """ Initializes the configuration with a random distribution of -1 and +1 """
         # Create an array of random 0 and 1 and scale array to -1 and 1
-        config = 2 * np.random.randint(0, 2, size=(self.n_sites, self.time_steps)) - 1
-        self.config = config.astype(self.dtype)
+        config = 2 * self.rng.integers(0, 2, size=(self.n_sites, self.time_steps)) - 1
+        self.config = np.asfortranarray(config, dtype=self.dtype)
 
     def update(self, i, t):
         """ Update element of array by flipping its spin-value
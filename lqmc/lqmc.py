@@ -6,14 +6,30 @@ version: 1.0
 """
 import time
 import numpy as np
-from scipy.linalg import expm
+from scipy.linalg import expm, circulant
+from scipy.linalg.blas import dger
+from scipy.fft import rfft2, irfft2
 from lqmc import HubbardModel, Configuration
 from lqmc.logging import get_logger, DEBUG
+from lqmc._nb_kernels import NUMBA_AVAILABLE, _update_step_nb, _update_slice_nb, _slice_buffers_nb
 
 
 class LatticeQMC:
 
-    def __init__(self, model, beta, time_steps, warmup=300, sweeps=2000, det_mode=False, log_lvl=DEBUG):
+    # Number of B-matrix multiplications between two QR-decompositions in 'get_gf' and
+    # number of time slices between two recomputations of the GF in the fast sweep
+    STAB_STEPS = 8
+    # Maximal deviation of a wrapped GF from the recomputed one before a warning is logged
+    WRAP_TOL = 1e-6
+    # Minimal number of sites of a periodic chain for wrapping the GF via FFTs
+    # (only very long chains, below the two dense matrix products are faster)
+    FFT_WRAP_SITES = 512
+    # Maximal number of delayed GF updates of the jit-sweep and minimal number of sites for using them
+    DELAY_STEPS = 16
+    DELAY_SITES = 128
+
+    def __init__(self, model, beta, time_steps, warmup=300, sweeps=2000, det_mode=False, log_lvl=DEBUG,
+                 jit=True, seed=None):
         """ Initialize the Lattice Quantum Monte-Carlo solver.
 
         Parameters
@@ -33,6 +49,11 @@ class LatticeQMC:
             the determinants is used. The default is 'False' (faster).
         log_lvl: int, optional
             Logging leven. The default is DEBUG.
+        jit: bool, optional
+            Flag if the Numba-compiled kernels are used in the fast mode. The flag
+            is ignored if Numba is not installed. The default is 'True'.
+        seed: int, optional
+            Seed of the random number generator. If 'None' a random seed is used.
         """
         if log_lvl is not None:
             # Init Logger with the given level
@@ -47,23 +68,30 @@ class LatticeQMC:
         self.model = model
         self.n_sites = model.n_sites
         self.time_steps = time_steps
-        self.config = Configuration(self.n_sites, time_steps)
+        self.rng = np.random.default_rng(seed)
+        self.config = Configuration(self.n_sites, time_steps, rng=self.rng)
         self.warm_sweeps = warmup
         self.meas_sweeps = sweeps
 
         # Iteration and mode attributes
         self.det_mode = det_mode
+        self.jit = jit and NUMBA_AVAILABLE
         self.status = ""
         self.it = 0
         self.ratio = 0.0
         self.acc = False
+        self.wrap_error = 0.
 
         # Cached and temperature-dependend attributes
         self.ham_kin = self.model.ham_kinetic()
         self.beta = 0.
         self.dtau = 0.
         self.lamb = 0.
+        self._exp_pm = None
+        self._delta_pm = None
         self.exp_k = None
+        self.exp_k_inv = None
+        self.wrap_weights = None
         # self.exp_v = None
 
         self._log_debug(f"u=          {self.model.u}")
@@ -72,6 +100,7 @@ class LatticeQMC:
         self._log_debug(f"sites=      {self.n_sites}")
         self._log_debug(f"time_steps= {self.time_steps}")
         self._log_debug(f"det_mode=   {self.det_mode}")
+        self._log_debug(f"jit=        {self.jit}")
         self._log_info(f"Warmup=     {self.warm_sweeps}")
         self._log_info(f"Measurement={self.meas_sweeps}")
         self._log_debug(f"END INIT")
@@ -103,7 +132,13 @@ class LatticeQMC:
         self.beta = beta
 
         self.lamb = np.arccosh(np.exp(self.model.u * self.dtau / 2.)) if self.model.u else 0
+        # Lookup tables of 'exp(\pm \lambda)' and 'exp(\pm 2\lambda) - 1', indexed by '(s + 1) // 2'
+        # for the HS-spin 's', since the HS-field only takes the values -1 and +1
+        self._exp_pm = np.exp(np.array([-1., +1.]) * self.lamb)
+        self._delta_pm = self._exp_pm ** 2 - 1
         self.exp_k = expm(-1 * self.dtau * self.ham_kin)
+        self.exp_k_inv = expm(+1 * self.dtau * self.ham_kin)
+        self.wrap_weights = self._fft_wrap_weights()
         # self.exp_v = np.zeros((self.n_sites, self.n_sites), dtype=np.float64)
 
         self._log_debug(f"beta=       {self.beta}")
@@ -116,6 +151,31 @@ class LatticeQMC:
             self._log_warning(f"Check-value {check_val:.2} should be smaller than 0.1!")
         self._log_debug(f"END SETUP")
 
+    def _fft_wrap_weights(self):
+        r""" Computes the weights of the wrap 'exp_k^{-1} G exp_k' in momentum space.
+
+        Notes
+        -----
+        The kinetic hamiltonian of a periodic chain is a (symmetric) circulant matrix,
+        which is diagonalized by the discrete Fourier transform. The similarity transform
+        with 'exp_k' is then a multiplication of the 2D-FFT of 'G' with the weights
+        .math:'w_{kq} = e^{\Delta\tau (\epsilon_k - \epsilon_q)}'.
+        This is only faster than the two matrix products for very long chains
+        (see 'FFT_WRAP_SITES'), below about 512 sites both are equally fast.
+
+        Returns
+        -------
+        weights: (N, N//2+1) np.ndarray or None
+            The weights for the real 2D-FFT or 'None' if the FFT can't or shouldn't be used.
+        """
+        ham_col = self.ham_kin[:, 0]
+        if self.n_sites < self.FFT_WRAP_SITES or not np.allclose(self.ham_kin, self.ham_kin.T) \
+                or not np.allclose(self.ham_kin, circulant(ham_col)):
+            return None
+        eig = np.fft.fft(ham_col).real
+        weights = np.exp(+self.dtau * eig)[:, np.newaxis] * np.exp(-self.dtau * eig)[np.newaxis, :]
+        return weights[:, :self.n_sites // 2 + 1]
+
     def set_temperature(self, temp):
         """ Sets the temperature and initializes the calculation.
 
@@ -130,12 +190,14 @@ class LatticeQMC:
     # ===========================================================================================
 
     def get_exp_v(self, l, sigma):
-        r""" Computes the Matrix exponential of 'V_\sigma(l)'
+        r""" Computes the diagonal of the Matrix exponential of 'V_\sigma(l)'
         Notes
         -----
         Since .math:'V_\sigma(l) = diag(h_{l, 1}, \dots, h_{l, N}' is a diagonal matrix,
         the numerical matrix exponential is not needed. The exponential of the diagonal elements
-        can be computed directly.
+        can be computed directly. Only the diagonal is returned, products with 'exp_v' are
+        computed by scaling the rows or columns of the other matrix. Since the HS-field only takes
+        the values -1 and +1, the exponentials are looked up in a table instead of being evaluated.
         Parameters
         ----------
         l: int
@@ -144,14 +206,9 @@ class LatticeQMC:
             Spin value.
         Returns
         -------
-        exp_v: (N, N) np.ndarray
+        exp_v: (N) np.ndarray
         """
-        diag = -1 * sigma * self.lamb * self.config[:, l]
-
-        # return expm(np.diagflat(diag))
-        # np.fill_diagonal(self.exp_v, np.exp(diag))
-        # return self.exp_v
-        return np.diagflat(np.exp(diag))
+        return self._exp_pm[(1 - sigma * self.config[:, l]) // 2]
 
     def get_m(self, l0, sigma):
         r""" Computes the 'M' matrices for spin '\sigma'
@@ -171,18 +228,185 @@ class LatticeQMC:
         m: (N, N) np.ndarray
         """
         # Initialize time slices in cyclic permutation:
-        # l0, l0-1, ..., 0, L-1, L-2, ..., l0+1
+        # l0-1, ..., 0, L-1, L-2, ..., l0
         l0 = l0 % self.time_steps
         indices = list(reversed(range(self.config.time_steps)))
         time_indices = indices[-l0:] + indices[:-l0]
-        # compute A=prod(B_l)
-        b_prod = 1
-        for l in time_indices:
-            exp_v = self.get_exp_v(l, sigma)
-            b = np.dot(self.exp_k, exp_v)
-            b_prod = np.dot(b_prod, b)
+        # compute A=prod(B_l) using preallocated buffers for the factors and products
+        b = np.empty((self.n_sites, self.n_sites), dtype=np.float64)
+        b_prod = np.empty_like(b)
+        tmp = np.empty_like(b)
+        np.multiply(self.exp_k, self.get_exp_v(time_indices[0], sigma)[np.newaxis, :], out=b_prod)
+        for l in time_indices[1:]:
+            np.multiply(self.exp_k, self.get_exp_v(l, sigma)[np.newaxis, :], out=b)
+            np.dot(b_prod, b, out=tmp)
+            b_prod, tmp = tmp, b_prod
         # Assemble M=I+prod(B)
-        return np.eye(self.n_sites) + b_prod
+        np.fill_diagonal(b_prod, b_prod.diagonal() + 1)
+        return b_prod
+
+    def get_gf(self, l0, sigma):
+        r""" Computes the Green's function 'G = M^{-1}' for spin '\sigma' in a numerically stable way.
+
+        Notes
+        -----
+        For large '\beta' the product of the B-matrices is ill-conditioned and 'M' can't be
+        inverted directly. The product is accumulated as 'U D T', where 'U' is orthogonal,
+        'D' diagonal and 'T' well conditioned, by a QR-decomposition every 'STAB_STEPS'
+        multiplications (see '_udt_qr'). The large and small scales of 'D = D_b D_s' are then
+        separated in
+        .. math::
+            G = (D_b^{-1} U^T + D_s T)^{-1} D_b^{-1} U^T
+
+        Parameters
+        ----------
+        l0: int
+            Time-slice index used for cyclic permutation.
+        sigma: int
+            Spin value.
+        Returns
+        -------
+        gf: (N, N) np.ndarray
+        """
+        # Initialize time slices in cyclic permutation (see 'get_m')
+        l0 = l0 % self.time_steps
+        indices = list(reversed(range(self.config.time_steps)))
+        time_indices = indices[-l0:] + indices[:-l0]
+        # Accumulate A=prod(B_l)=UDT from the right
+        u = np.eye(self.n_sites, dtype=np.float64)
+        d = np.ones(self.n_sites, dtype=np.float64)
+        t = np.eye(self.n_sites, dtype=np.float64)
+        for k, l in enumerate(reversed(time_indices)):
+            b = self.exp_k * self.get_exp_v(l, sigma)[np.newaxis, :]
+            u = np.dot(b, u)
+            if (k + 1) % self.STAB_STEPS == 0 or k + 1 == self.time_steps:
+                u, d, t = self._udt_qr(u, d, t)
+        # Assemble G=(I+UDT)^{-1}
+        d_big = np.maximum(d, 1.)
+        d_small = np.minimum(d, 1.)
+        u_t = u.T / d_big[:, np.newaxis]
+        return np.linalg.solve(u_t + d_small[:, np.newaxis] * t, u_t)
+
+    @staticmethod
+    def _udt_qr(u, d, t):
+        r""" Restores the 'U D T'-decomposition after 'U' was multiplied by B-matrices from the left.
+
+        Notes
+        -----
+        The columns of 'U D' are sorted by their norm before the QR-decomposition
+        (pre-pivoting). Otherwise the scales in 'D' get mixed and the GF loses about half of
+        its significant digits on larger lattices:
+        .. math::
+            U D P = Q R,   U' = Q,   D' = |diag(R)|,   T' = D'^{-1} R P^T T
+
+        Parameters
+        ----------
+        u: (N, N) np.ndarray
+        d: (N) np.ndarray
+        t: (N, N) np.ndarray
+        Returns
+        -------
+        u, d, t: np.ndarray
+        """
+        ud = u * d[np.newaxis, :]
+        p = np.argsort(-np.linalg.norm(ud, axis=0))
+        q, r = np.linalg.qr(ud[:, p])
+        d = np.abs(np.diagonal(r))
+        t = np.dot(r / d[:, np.newaxis], t[p, :])
+        return q, d, t
+
+    @staticmethod
+    def _gf_udt(left, right):
+        r""" Computes the GF from the stabilized B-products left and right of the cut.
+
+        Notes
+        -----
+        With the product 'A_L = U_L D_L T_L' of the left and 'A_R^T = U_R D_R T_R' of the
+        transposed right B-matrices, the GF .math'G = (I + A_L A_R)^{-1}' is computed as
+        .. math::
+            G = U_R D_{R,b}^{-1} (D_{L,b}^{-1} U_L^T U_R D_{R,b}^{-1} + D_{L,s} T_L T_R^T D_{R,s})^{-1}
+                D_{L,b}^{-1} U_L^T
+        where the large and small scales of 'D = D_b D_s' are separated.
+
+        Parameters
+        ----------
+        left: tuple of np.ndarray
+            Decomposition 'U_L, D_L, T_L' of the left product.
+        right: tuple of np.ndarray
+            Decomposition 'U_R, D_R, T_R' of the transposed right product.
+        Returns
+        -------
+        gf: (N, N) np.ndarray
+        """
+        u_l, d_l, t_l = left
+        u_r, d_r, t_r = right
+        dl_big, dl_small = np.maximum(d_l, 1.), np.minimum(d_l, 1.)
+        dr_big, dr_small = np.maximum(d_r, 1.), np.minimum(d_r, 1.)
+        mat = np.dot(u_l.T, u_r) / dl_big[:, np.newaxis] / dr_big[np.newaxis, :]
+        mat += dl_small[:, np.newaxis] * np.dot(t_l, t_r.T) * dr_small[np.newaxis, :]
+        return np.dot(u_r / dr_big[np.newaxis, :], np.linalg.solve(mat, u_l.T / dl_big[:, np.newaxis]))
+
+    def _b_stack(self, sigma):
+        r""" Computes the stabilized partial products of the B-matrices for the fast sweep.
+
+        Parameters
+        ----------
+        sigma: int
+            Spin value.
+        Returns
+        -------
+        stack: list of tuple
+            The 'U D T'-decompositions of the products .math'B_{js-1} \dots B_0' of the first
+            'j' blocks of 's = STAB_STEPS' time slices, for all blocks 'j' of the sweep.
+        """
+        u = np.eye(self.n_sites, dtype=np.float64)
+        d = np.ones(self.n_sites, dtype=np.float64)
+        t = np.eye(self.n_sites, dtype=np.float64)
+        stack = [(u, d, t)]
+        for l0 in range(0, self.time_steps - self.STAB_STEPS, self.STAB_STEPS):
+            for l in range(l0, l0 + self.STAB_STEPS):
+                u = np.dot(self.exp_k * self.get_exp_v(l, sigma)[np.newaxis, :], u)
+            u, d, t = self._udt_qr(u, d, t)
+            stack.append((u, d, t))
+        return stack
+
+    def _refresh_gf(self, gf, l, sigma, stack, right):
+        r""" Adds the updated time slice 'l' to the B-product of the slices above and refreshes the GF.
+
+        The transposed product .math'B_l^T \dots B_{L-1}^T' of the updated time slices is
+        accumulated in 'right', which is modified in place. At the first time slice of each
+        block of 'STAB_STEPS' slices the product is decomposed and the GF is recomputed from it
+        and the partial product of the slices below from 'stack' (see '_b_stack'), since the
+        rounding errors of the wrapping grow exponentially with the number of wraps.
+        The deviation of the wrapped GF is stored in 'wrap_error'.
+
+        Parameters
+        ----------
+        gf: (N, N) np.ndarray
+            Green's function of the time slice 'l' after the updates of the slice.
+        l: int
+            Time-slice index.
+        sigma: int
+            Spin value.
+        stack: list of tuple
+            Partial products of the time slices below the current one, see '_b_stack'.
+        right: list of np.ndarray
+            Decomposition 'U, D, T' of the transposed product of the time slices above.
+        Returns
+        -------
+        gf: (N, N) np.ndarray
+        """
+        u, d, t = right
+        right[0] = np.dot(self.get_exp_v(l, sigma)[:, np.newaxis] * self.exp_k.T, u)
+        if l % self.STAB_STEPS:
+            return gf
+        right[:] = self._udt_qr(*right)
+        gf_new = self._gf_udt(stack[l // self.STAB_STEPS], right)
+        error = np.max(np.abs(gf_new - gf))
+        self.wrap_error = max(self.wrap_error, error)
+        if error > self.WRAP_TOL:
+            self._log_warning(f"Wrapping error {error:.2} at time slice {l} larger than {self.WRAP_TOL}")
+        return gf_new
 
     def iter_sweeps(self, n, console_updates=200):
         """ Iterates over the specified number of sweeps.
@@ -234,6 +458,8 @@ class LatticeQMC:
     # ===========================================================================================
 
     def _update_step_det(self, old_det):
+        # Draw the random numbers of the whole sweep at once
+        rands = self.rng.random((self.time_steps, self.n_sites))
         # Iterate over all time-steps, starting at the end (.math:'\beta')
         for l in reversed(range(self.time_steps)):
             # Iterate over all lattice sites
@@ -246,7 +472,7 @@ class LatticeQMC:
                 # Compute the new determinant for both matrices for the acceptance ratio
                 new_det = np.linalg.det(m_up) * np.linalg.det(m_dn)
                 self.ratio = new_det / old_det
-                self.acc = np.random.rand() <= self.ratio
+                self.acc = rands[l, i] <= self.ratio
                 if self.acc:
                     # Move accepted:
                     # Continue using the new configuration
@@ -273,6 +499,9 @@ class LatticeQMC:
     def measure_loop_det(self):
         r""" Runs the slow version of the LQMC measurement-loop and returns the Green's function.
 
+        The Green's function 'get_gf(0)' of the first time slice is measured once per sweep,
+        see 'measure_loop' for the estimator of the fast version.
+
         Returns
         -------
         gf: (2, N, N) np.ndarray
@@ -285,94 +514,154 @@ class LatticeQMC:
         # Initialize the determinant for both matrices
         old_det = np.linalg.det(m_up) * np.linalg.det(m_dn)
         # Initialize greens functions
-        gf_total_up = np.zeros((self.n_sites, self.n_sites), dtype=np.float64)
-        gf_total_dn = np.zeros((self.n_sites, self.n_sites), dtype=np.float64)
+        gf_total = np.zeros((2, self.n_sites, self.n_sites), dtype=np.float64)
         # Measurement-sweeps
         for _ in self.iter_sweeps(self.meas_sweeps):
             old_det = self._update_step_det(old_det)
             # Perform measurements
-            m_up = self.get_m(0, sigma=+1)
-            m_dn = self.get_m(0, sigma=-1)
-            gf_total_up += np.linalg.inv(m_up)
-            gf_total_dn += np.linalg.inv(m_dn)
+            gf_total[0] += self.get_gf(0, sigma=+1)
+            gf_total[1] += self.get_gf(0, sigma=-1)
         # Return the normalized total green functions
-        return np.asarray([gf_total_up, gf_total_dn]) / self.meas_sweeps
+        gf_total /= self.meas_sweeps
+        return gf_total
 
-    def _update_step(self):
-        # Compute M matrices
-        m_up = self.get_m(0, sigma=+1)
-        m_dn = self.get_m(0, sigma=-1)
-        # Initialize greens functions
-        gf_up = np.linalg.inv(m_up)
-        gf_dn = np.linalg.inv(m_dn)
+    def _wrap(self, gf, exp_v):
+        r""" Wraps the GF to the previous time slice: 'G_{l-1} = B_{l-1}^{-1} G_l B_{l-1}'
+
+        Parameters
+        ----------
+        gf: (N, N) np.ndarray
+            Green's function of the time slice 'l'. The array is overwritten.
+        exp_v: (N) np.ndarray
+            Diagonal of 'exp(V_{l-1})', see 'get_exp_v'.
+        Returns
+        -------
+        gf: (N, N) np.ndarray
+        """
+        if self.wrap_weights is not None:
+            gf = irfft2(self.wrap_weights * rfft2(gf), s=gf.shape)
+        else:
+            # The result of the second product is written back into the GF array
+            np.dot(np.dot(self.exp_k_inv, gf), self.exp_k, out=gf)
+        # Scale rows and columns in place with the diagonal 'exp(V)'-factors
+        gf /= exp_v[:, np.newaxis]
+        gf *= exp_v[np.newaxis, :]
+        return gf
+
+    def _update_slice(self, gf_up, gf_dn, l, rands):
+        # Iterate over all lattice sites
+        for i in range(self.n_sites):
+            # Compute acceptance ratio
+            idx = (self.config[i, l] + 1) // 2
+            d_up = self._delta_pm[idx]
+            d_dn = self._delta_pm[1 - idx]
+            r_up = 1 + (1 - gf_up[i, i]) * d_up
+            r_dn = 1 + (1 - gf_dn[i, i]) * d_dn
+            self.ratio = r_up * r_dn
+            self.acc = rands[i] <= self.ratio
+            if self.acc:
+                # Update Greens function (Sherman-Morrison):
+                # G' = G + d/r (G[:, i] - e_i) G[i, :]
+                u_up = gf_up[:, i].copy()
+                u_up[i] -= 1
+                u_dn = gf_dn[:, i].copy()
+                u_dn[i] -= 1
+                # The BLAS rank-1 update works in place on the (Fortran-ordered)
+                # transpose of the GF, so the vectors are passed in reversed order.
+                # The result is assigned, since a non-contiguous GF is updated in a copy
+                gf_up = dger(d_up / r_up, gf_up[i, :].copy(), u_up, a=gf_up.T, overwrite_a=1).T
+                gf_dn = dger(d_dn / r_dn, gf_dn[i, :].copy(), u_dn, a=gf_dn.T, overwrite_a=1).T
+                # Update HS-field
+                self.config.update(i, l)
+
+            self._debug(i, l)
+        return gf_up, gf_dn
+
+    def _update_step(self, gf_total=None, update_slice=None):
+        # Initialize greens functions of the last time slice, such that 'B_{L-1}'
+        # is the last factor of the B-product
+        gf_up = self.get_gf(self.time_steps - 1, sigma=+1)
+        gf_dn = self.get_gf(self.time_steps - 1, sigma=-1)
+        # Stabilized B-products of the time slices below and above the current slice
+        stack_up, stack_dn = self._b_stack(+1), self._b_stack(-1)
+        right_up = [np.eye(self.n_sites), np.ones(self.n_sites), np.eye(self.n_sites)]
+        right_dn = [np.eye(self.n_sites), np.ones(self.n_sites), np.eye(self.n_sites)]
+        self.wrap_error = 0.
+        update_slice = update_slice or self._update_slice
+        # Draw the random numbers of the whole sweep at once
+        rands = self.rng.random((self.time_steps, self.n_sites))
         # Iterate over all time-steps, starting at the end (.math:'\beta')
         for l in reversed(range(self.time_steps)):
-            # Iterate over all lattice sites
-            for i in range(self.n_sites):
-                # Compute acceptance ratio
-                arg = 2 * self.lamb * self.config[i, l]
-                d_up = 1 + (1 - gf_up[i, i]) * (np.exp(+arg) - 1)
-                d_dn = 1 + (1 - gf_dn[i, i]) * (np.exp(-arg) - 1)
-                self.ratio = d_up * d_dn
-                self.acc = np.random.rand() <= self.ratio
-                if self.acc:
-                    # Update Greens function
-                    c_up = -(np.exp(-arg) - 1) * gf_up[i, :]
-                    c_up[i] += (np.exp(-arg) - 1)
-                    c_dn = -(np.exp(+arg) - 1) * gf_dn[i, :]
-                    c_dn[i] += (np.exp(+arg) - 1)
-                    # These are the bs in the tutorial, but I call them e
-                    # here to avoid confusing them with the B-matrices
-                    e_up = gf_up[:, i] / (1 + c_up[i])
-                    e_dn = gf_dn[:, i] / (1 + c_dn[i])
-                    for j in range(self.n_sites):
-                        for k in range(self.n_sites):
-                            gf_up[j, k] = gf_up[j, k] - e_up[j] * c_up[k]
-                            gf_dn[j, k] = gf_dn[j, k] - e_dn[j] * c_dn[k]
-                    # Update HS-field
-                    self.config.update(i, l)
+            gf_up, gf_dn = update_slice(gf_up, gf_dn, l, rands[l])
 
-                self._debug(i, l)
+            # Recompute the GF every 'STAB_STEPS' time slices
+            gf_up = self._refresh_gf(gf_up, l, +1, stack_up, right_up)
+            gf_dn = self._refresh_gf(gf_dn, l, -1, stack_dn, right_dn)
 
-            # Update the GF for the next time slice (Wrapping)
-            if l > 0:  # Only do this, if this is not the last l-loop
-                exp_v_up = self.get_exp_v(l - 1, sigma=+1)
-                exp_v_dn = self.get_exp_v(l - 1, sigma=-1)
-                b_up = np.dot(exp_v_up, self.exp_k)
-                b_dn = np.dot(exp_v_dn, self.exp_k)
+            # Accumulate the equal-time GF of the time slice in place for measurements
+            if gf_total is not None:
+                gf_total[0] += gf_up
+                gf_total[1] += gf_dn
 
-                gf_up = np.dot(np.dot(b_up, gf_up), np.linalg.inv(b_up))
-                gf_dn = np.dot(np.dot(b_dn, gf_dn), np.linalg.inv(b_dn))
+            # Update the GF for the next time slice (Wrapping): G_{l-1} = B_{l-1}^{-1} G_l B_{l-1}
+            if l > 0:  # Only do this, if this is not the last l-loop
+                gf_up = self._wrap(gf_up, self.get_exp_v(l - 1, sigma=+1))
+                gf_dn = self._wrap(gf_dn, self.get_exp_v(l - 1, sigma=-1))
 
         return gf_up, gf_dn
 
+    def _update_step_jit(self, gf_total=None):
+        delay_steps = self.DELAY_STEPS if self.n_sites >= self.DELAY_SITES else 0
+        if self.wrap_weights is not None:
+            # Numba doesn't support FFTs: Only the updates of the time slices are compiled and
+            # the sweep is run by '_update_step', which wraps the GF via FFTs
+            buffers = _slice_buffers_nb(self.n_sites, delay_steps)
+
+            def update_slice(gf_up, gf_dn, l, rands):
+                _update_slice_nb(gf_up, gf_dn, self.config.config, l, self._delta_pm, rands, *buffers)
+                return gf_up, gf_dn
+
+            return self._update_step(gf_total, update_slice)
+        # Draw the random numbers of the whole sweep at once
+        rands = self.rng.random((self.time_steps, self.n_sites))
+        return _update_step_nb(self.config.config, self.exp_k, self.exp_k_inv, self._exp_pm,
+                               self._delta_pm, rands, self.STAB_STEPS, delay_steps, gf_total)
+
     def warmup_loop(self):
         """ Runs the fast version of the LQMC warmup-loop """
         self.status = "Warmup"
+        update_step = self._update_step_jit if self.jit else self._update_step
         # Warmup-sweeps
         for _ in self.iter_sweeps(self.warm_sweeps):
-            self._update_step()
+            update_step()
 
     def measure_loop(self):
         r""" Runs the fast version of the LQMC measurement-loop and returns the Green's function.
 
+        The equal-time Green's function is measured at every time slice of each sweep and
+        accumulated in place during the sweep, the result is the average over all slices and
+        sweeps. Note that this is a different estimator than the one of 'measure_loop_det',
+        which only measures 'get_gf(0)' once per sweep. Both estimate the same expectation value
+        (all time slices are equivalent under cyclic permutation), but the average over the
+        slices has a smaller variance.
+
+        Returns
+        -------
         gf: (2, N, N) np.ndarray
             Measured Green's function .math'G' of the up- and down-spin channel.
         """
         self.status = "Measurement"
         # Initialize greens functions
-        gf_total_up = np.zeros((self.n_sites, self.n_sites), dtype=np.float64)
-        gf_total_dn = np.zeros((self.n_sites, self.n_sites), dtype=np.float64)
+        gf_total = np.zeros((2, self.n_sites, self.n_sites), dtype=np.float64)
+        update_step = self._update_step_jit if self.jit else self._update_step
         # Measurement-sweeps
         for _ in self.iter_sweeps(self.meas_sweeps):
-            # Initialize greens functions
-            gf_up, gf_dn = self._update_step()
-            # Perform measurements
-            gf_total_up += gf_up
-            gf_total_dn += gf_dn
+            # Perform the sweep and the measurements
+            update_step(gf_total)
 
         # Return the normalized total green functions
-        return np.asarray([gf_total_up, gf_total_dn]) / self.meas_sweeps
+        gf_total /= self.meas_sweeps * self.time_steps
+        return gf_total
 
     # ===========================================================================================
 
@@ -9,9 +9,15 @@ import os
 import time
 import numpy as np
 import itertools
+import contextlib
 import multiprocessing
 from .lqmc import LatticeQMC
 
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
+
 
 def timestr(seconds):
     mins, secs = divmod(seconds, 60)
@@ -44,10 +50,17 @@ class LqmcProcess(LatticeQMC, multiprocessing.Process):
 
     def run(self):
         # Set seed here to be sure pid is correct
-        np.random.seed(self.pid)
+        self.rng = np.random.default_rng(self.pid)
+        self.config.rng = self.rng
         self.config.initialize()
+        # Restrict BLAS to one thread per process, the processes already use all cores
+        if threadpool_limits is not None:
+            limits = threadpool_limits(limits=1)
+        else:
+            limits = contextlib.nullcontext()
         # Run LQMC
-        gf = self.run_lqmc()
+        with limits:
+            gf = self.run_lqmc()
         # Send results to main thread
         self.pipe.send(gf)
 
@@ -263,8 +276,9 @@ class ParallelProcessManager(ProcessManager):
         super().set_jobs(sweeps=sweeplist)
 
     def get_result(self):
+        # Weight the results of the processes by their number of measurement-sweeps
         gf_data = super().get_result()
-        return np.sum(gf_data, axis=0) / self.max_procs
+        return np.average(gf_data, axis=0, weights=self.var_kwargs['sweeps'])
 
     @staticmethod
     def _frmt_items(items, delim, width):
@@ -124,6 +124,49 @@ def local_gf(gf):
     return np.diagonal(gf, axis1=-2, axis2=-1)
 
 
+def translational_gf(gf, shape):
+    r""" Computes the translationally averaged Green's function .math'G(\Delta r)'.
+
+    .. math::
+        G(\Delta r) = \frac{1}{N} \sum_r G_{r + \Delta r, r}
+
+    Periodic boundary conditions are assumed along all axes of the lattice. The sum is
+    evaluated for all displacements at once by gathering the matrix elements. Only lattices
+    with one atom per unit cell are supported, the number of sites 'N' has to match the
+    number of cells given by 'shape'.
+
+    Parameters
+    ----------
+    gf: (..., N, N) array_like
+        Green's function matrices.
+    shape: array_like of int
+        Shape of the lattice, for example 'model.lattice.shape'.
+
+    Returns
+    -------
+    gf_delta: (..., *shape) np.ndarray
+
+    Raises
+    ------
+    ValueError
+        If the number of sites of the Green's function doesn't match the lattice shape.
+    """
+    gf = np.asarray(gf)
+    shape = tuple(int(s) for s in shape)
+    n_sites = int(np.prod(shape))
+    if gf.shape[-1] != n_sites or gf.shape[-2] != n_sites:
+        raise ValueError(f"Green's function of shape {gf.shape[-2:]} doesn't match the {n_sites} sites "
+                         f"of the lattice shape {shape} (only one atom per unit cell is supported)")
+    # Lattice coordinates of the sites, which are ordered row-major in the lattice shape
+    coords = np.array(np.unravel_index(np.arange(n_sites), shape))
+    # Index of the site 'r + Δr' for all displacements 'Δr' (rows) and sites 'r' (columns)
+    periods = np.array(shape)[:, np.newaxis, np.newaxis]
+    shifted = (coords[:, :, np.newaxis] + coords[:, np.newaxis, :]) % periods
+    indices = np.ravel_multi_index(tuple(shifted), shape)
+    gf_delta = np.mean(gf[..., indices, np.arange(n_sites)], axis=-1)
+    return gf_delta.reshape(gf.shape[:-2] + shape)
+
+
 def matsubara_frequencies(points, beta):
     """ Returns the fermionic Matsubara frequencies :math:'iω_n' for the points 'points'.
 